@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
-import requests
-import hashlib
-import random
 import sys
 
+from benchmark_util import TimeoutSession, load_block
+
 SERVER_URL = "http://localhost:8081"
 
 # Получаем размер блока из аргумента или используем 4KB по умолчанию
@@ -14,18 +13,18 @@ print("="*60)
 print("Тестирование HTTP сервера с io_uring + splice + AF_ALG")
 print("="*60)
 
-# Генерируем 1 случайный блок
-print(f"\nГенерация блока данных {BLOCK_SIZE // 1024}KB...")
-block_data = bytes(random.getrandbits(8) for _ in range(BLOCK_SIZE))
-
-# Вычисляем ожидаемый хеш
-expected_hash = hashlib.sha256(block_data).hexdigest()
+# Загружаем 1 случайный блок и его ожидаемый хеш
+print(f"\nЗагрузка блока данных {BLOCK_SIZE // 1024}KB...")
+block_data, expected_hash = load_block(BLOCK_SIZE)
 print(f"Ожидаемый SHA256: {expected_hash}")
 
+# Одна сессия с keep-alive на PUT и GET
+session = TimeoutSession(timeout=5)
+
 # PUT запрос
 print("\nОтправка PUT запроса...")
 try:
-    response = requests.put(f"{SERVER_URL}", data=block_data, timeout=5)
+    response = session.put(f"{SERVER_URL}", data=block_data)
 
     if response.status_code == 200:
         returned_hash = response.text.strip()
@@ -36,7 +35,7 @@ try:
 
             # GET запрос для получения данных обратно
             print("\nОтправка GET запроса...")
-            get_response = requests.get(f"{SERVER_URL}/{returned_hash}", timeout=5)
+            get_response = session.get(f"{SERVER_URL}/{returned_hash}")
 
             if get_response.status_code == 200:
                 retrieved_data = get_response.content
@@ -58,5 +57,7 @@ try:
 
 except Exception as e:
     print(f"✗ Исключение: {e}")
+finally:
+    session.close()
 
 print("="*60)
@@ -0,0 +1,56 @@
+"""Общая подготовка данных для тестов http_file_ring"""
+import hashlib
+import mmap
+import os
+
+import requests
+
+
+def _write_atomic(path, data):
+    """Запись через временный файл и os.replace: прерванный запуск не оставит обрезанный файл"""
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def load_block(block_size):
+    """Случайный блок кешируется в /tmp вместе с хешем и отдаётся через mmap:
+    генерация и хеширование только при первом запуске"""
+    path = f"/tmp/bench-{block_size}.bin"
+    hash_path = path + ".sha256"
+
+    # Файл другого размера (обрезан или испорчен) генерируется заново, вместе с хешем
+    if not os.path.exists(path) or os.path.getsize(path) != block_size:
+        # Старый хеш удаляется до записи блока: сбой между шагами не оставит чужой хеш
+        if os.path.exists(hash_path):
+            os.remove(hash_path)
+        _write_atomic(path, os.urandom(block_size))
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        mm = mmap.mmap(fd, block_size, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+    block_data = memoryview(mm)
+
+    if os.path.exists(hash_path):
+        with open(hash_path) as f:
+            expected_hash = f.read().strip()
+    else:
+        expected_hash = hashlib.sha256(block_data).hexdigest()
+        _write_atomic(hash_path, expected_hash.encode("ascii"))
+
+    return block_data, expected_hash
+
+
+
+class TimeoutSession(requests.Session):
+    """Сессия basic.py и proxy-test.py: keep-alive и общий таймаут для запросов без явного timeout"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
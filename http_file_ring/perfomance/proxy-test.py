@@ -1,47 +1,36 @@
 #!/usr/bin/env python3
-import requests
-import hashlib
-import random
 import time
 
-def test_block(block_size_kb):
-    """Тестирование блока определенного размера"""
-    block_size = block_size_kb * 1024
-
-    print("\n" + "="*60)
-    print(f"Тест {block_size_kb}KB блока: напрямую vs через pasta")
-    print("="*60)
+from benchmark_util import TimeoutSession, load_block
 
-    # Генерируем блок данных
-    print(f"\nГенерация блока данных {block_size_kb}KB...")
-    block_data = bytes(random.getrandbits(8) for _ in range(block_size))
-    expected_hash = hashlib.sha256(block_data).hexdigest()
-    print(f"Ожидаемый SHA256: {expected_hash}")
+# Общая сессия: соединения к каждому порту переиспользуются между запросами
+session = TimeoutSession(timeout=10)
 
-    # Тест 1: Напрямую (порт 8080)
+def test_target(title, url, block_data, expected_hash):
+    """PUT + GET одного блока на заданный адрес, хеш посчитан заранее"""
     print("\n" + "-"*60)
-    print("ТЕСТ 1: Напрямую на порт 8080")
+    print(title)
     print("-"*60)
     try:
-        start = time.time()
-        response = requests.put("http://localhost:8080", data=block_data, timeout=10)
-        elapsed = time.time() - start
+        start = time.perf_counter_ns()
+        response = session.put(url, data=block_data)
+        elapsed_ns = time.perf_counter_ns() - start
 
         if response.status_code == 200:
             returned_hash = response.text.strip()
-            print(f"✓ PUT успешен за {elapsed:.3f}s")
+            print(f"✓ PUT успешен за {elapsed_ns / 1e6:.3f}ms")
             print(f"  Полученный хеш: {returned_hash}")
 
             if returned_hash == expected_hash:
                 print("✓ Хеш совпадает!")
 
                 # GET запрос
-                start = time.time()
-                get_response = requests.get(f"http://localhost:8080/{returned_hash}", timeout=10)
-                elapsed = time.time() - start
+                start = time.perf_counter_ns()
+                get_response = session.get(f"{url}/{returned_hash}")
+                elapsed_ns = time.perf_counter_ns() - start
 
                 if get_response.status_code == 200 and get_response.content == block_data:
-                    print(f"✓ GET успешен за {elapsed:.3f}s")
+                    print(f"✓ GET успешен за {elapsed_ns / 1e6:.3f}ms")
                     print("✓ Данные совпадают!")
                 else:
                     print("✗ GET провален")
@@ -52,47 +41,35 @@ def test_block(block_size_kb):
     except Exception as e:
         print(f"✗ Исключение: {e}")
 
-    # Тест 2: Через pasta (порт 8081)
-    print("\n" + "-"*60)
-    print("ТЕСТ 2: Через pasta на порт 8081")
-    print("-"*60)
-    try:
-        start = time.time()
-        response = requests.put("http://localhost:8081", data=block_data, timeout=10)
-        elapsed = time.time() - start
+def test_block(block_size_kb):
+    """Тестирование блока определенного размера"""
+    block_size = block_size_kb * 1024
 
-        if response.status_code == 200:
-            returned_hash = response.text.strip()
-            print(f"✓ PUT успешен за {elapsed:.3f}s")
-            print(f"  Полученный хеш: {returned_hash}")
+    print("\n" + "="*60)
+    print(f"Тест {block_size_kb}KB блока: напрямую vs через pasta")
+    print("="*60)
 
-            if returned_hash == expected_hash:
-                print("✓ Хеш совпадает!")
+    # Загружаем блок данных и его хеш один раз для обоих тестов
+    print(f"\nЗагрузка блока данных {block_size_kb}KB...")
+    block_data, expected_hash = load_block(block_size)
+    print(f"Ожидаемый SHA256: {expected_hash}")
 
-                # GET запрос
-                start = time.time()
-                get_response = requests.get(f"http://localhost:8081/{returned_hash}", timeout=10)
-                elapsed = time.time() - start
+    # Тест 1: Напрямую (порт 8080)
+    test_target("ТЕСТ 1: Напрямую на порт 8080", "http://localhost:8080", block_data, expected_hash)
 
-                if get_response.status_code == 200 and get_response.content == block_data:
-                    print(f"✓ GET успешен за {elapsed:.3f}s")
-                    print("✓ Данные совпадают!")
-                else:
-                    print("✗ GET провален")
-            else:
-                print("✗ Хеш не совпадает!")
-        else:
-            print(f"✗ PUT провален: {response.status_code}")
-    except Exception as e:
-        print(f"✗ Исключение: {e}")
+    # Тест 2: Через pasta (порт 8081)
+    test_target("ТЕСТ 2: Через pasta на порт 8081", "http://localhost:8081", block_data, expected_hash)
 
 # Запускаем тесты: сначала 8KB, потом 512KB
 print("="*60)
 print("ТЕСТИРОВАНИЕ БЛОКОВ РАЗНЫХ РАЗМЕРОВ")
 print("="*60)
 
-test_block(8)      # 8 KB
-test_block(512)    # 512 KB
+try:
+    test_block(8)      # 8 KB
+    test_block(512)    # 512 KB
+finally:
+    session.close()
 
 print("\n" + "="*60)
 print("ТЕСТЫ ЗАВЕРШЕНЫ")
@@ -1,67 +1,93 @@
 #!/usr/bin/env python3
 import httpx
-import hashlib
+import os
 import time
-import struct
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import statistics
+import sys
+
+from benchmark_util import generate_blocks
 
 SERVER_URL = "http://localhost:10001"
 BLOCK_SIZE = 4096
 NUM_BLOCKS = 100
-NUM_WORKERS = 10  # Параллельные потоки
-
-print(f"=== FastBlock Parallel Benchmark: {NUM_BLOCKS} blocks x {BLOCK_SIZE} bytes, {NUM_WORKERS} workers ===")
-
-# Генерируем уникальные блоки
-blocks = []
-hashes = []
-
-for i in range(NUM_BLOCKS):
-    block = struct.pack('<Q', i) + b'A' * (BLOCK_SIZE - 8)
-    expected_hash = hashlib.sha256(block).hexdigest()
-    blocks.append(block)
-    hashes.append(expected_hash)
-
-# Создаем HTTP клиент с connection pooling
-client = httpx.Client(
-    timeout=10.0,
-    limits=httpx.Limits(max_keepalive_connections=NUM_WORKERS * 2, max_connections=NUM_WORKERS * 2),
-    http2=False
-)
-
-def put_block(index):
+NUM_WORKERS = 32  # Параллельные воркеры = запросов в полёте, у каждого не больше одного соединения одновременно
+# --http2: одно HTTP/2 соединение (prior knowledge, нужен pip install httpx[http2]),
+# все запросы фазы мультиплексируются по нему; без флага - HTTP/1.1 по соединению на воркер
+HTTP2 = "--http2" in sys.argv[1:]
+CLIENT_CPUS = {4, 5, 6, 7}  # Ядра клиента; сервер запускать на других: taskset -c 0-3 ...
+
+# Клиент не должен делить ядра с io_uring сервером и мигрировать между ними
+if hasattr(os, "sched_setaffinity"):
+    cpus = CLIENT_CPUS & os.sched_getaffinity(0)
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+        print(f"Client pinned to CPUs {sorted(cpus)}")
+    else:
+        print(f"CPUs {sorted(CLIENT_CPUS)} unavailable, running without affinity")
+
+if HTTP2:
+    print(f"=== FastBlock Parallel Benchmark: {NUM_BLOCKS} blocks x {BLOCK_SIZE} bytes, HTTP/2, 1 connection ===")
+else:
+    print(f"=== FastBlock Parallel Benchmark: {NUM_BLOCKS} blocks x {BLOCK_SIZE} bytes, {NUM_WORKERS} workers ===")
+
+# httpx принимает только bytes: memoryview он считает итератором и шлёт чанками,
+# поэтому каждый блок копируется из общего буфера один раз
+blocks, hashes = generate_blocks(NUM_BLOCKS, BLOCK_SIZE)
+blocks = [block.tobytes() for block in blocks]
+# Ответ PUT сравниваем как bytes, без декодирования тела в str
+hashes_bytes = [expected_hash.encode('ascii') for expected_hash in hashes]
+
+def timed(op):
+    """Оборачивает операцию: к результату (index, success, error) добавляется латентность запроса в наносекундах"""
+    async def wrapper(client, index):
+        start = time.perf_counter_ns()
+        index, success, error = await op(client, index)
+        return (index, success, error, time.perf_counter_ns() - start)
+    return wrapper
+
+def latency_summary(results):
+    """p50/p99 латентности успешных запросов в миллисекундах"""
+    latencies = [latency for _, success, _, latency in results if success]
+    if len(latencies) < 2:
+        return "p50 n/a, p99 n/a"
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return f"p50 {cuts[49] / 1e6:.2f}ms, p99 {cuts[98] / 1e6:.2f}ms"
+
+@timed
+async def put_block(client, index):
     try:
-        response = client.put(f"{SERVER_URL}/", content=blocks[index])
+        response = await client.put(f"{SERVER_URL}/", content=blocks[index])
         if response.status_code == 200:
-            returned_hash = response.text.strip()
-            if returned_hash == hashes[index]:
+            returned_hash = response.content.rstrip()
+            if returned_hash == hashes_bytes[index]:
                 return (index, True, None)
             else:
-                return (index, False, f"Hash mismatch: expected {hashes[index]}, got {returned_hash}")
+                return (index, False, f"Hash mismatch: expected {hashes[index]}, got {returned_hash.decode('ascii', 'replace')}")
         else:
             return (index, False, f"Status {response.status_code}")
     except Exception as e:
         return (index, False, str(e))
 
-def get_block(index):
+@timed
+async def get_block(client, index):
     try:
-        response = client.get(f"{SERVER_URL}/{hashes[index]}")
+        response = await client.get(f"{SERVER_URL}/{hashes[index]}")
         if response.status_code == 200:
             retrieved_data = response.content
             if len(retrieved_data) == BLOCK_SIZE and retrieved_data == blocks[index]:
                 return (index, True, None)
             else:
-                actual_hash = hashlib.sha256(retrieved_data).hexdigest() if len(retrieved_data) == BLOCK_SIZE else "size_mismatch"
-                return (index, False, f"Data mismatch: expected {hashes[index]}, got {actual_hash}, size {len(retrieved_data)}")
+                return (index, False, f"Data mismatch: expected {hashes[index]}, size {len(retrieved_data)}")
         else:
             return (index, False, f"Status {response.status_code}")
     except Exception as e:
         return (index, False, str(e))
 
-def delete_block(index):
+@timed
+async def delete_block(client, index):
     try:
-        response = client.delete(f"{SERVER_URL}/{hashes[index]}")
+        response = await client.delete(f"{SERVER_URL}/{hashes[index]}")
         if response.status_code == 200:
             return (index, True, None)
         else:
@@ -69,64 +95,101 @@ def delete_block(index):
     except Exception as e:
         return (index, False, str(e))
 
-try:
-    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
-        # === ТЕСТ PUT ===
-        put_start = time.time()
-        results = list(executor.map(put_block, range(NUM_BLOCKS)))
-        put_end = time.time()
+async def put_get_block(client, index):
+    """GET блока уходит сразу после его PUT, не дожидаясь окончания остальных PUT"""
+    put_result = await put_block(client, index)
+    get_result = await get_block(client, index) if put_result[1] else None
+    return (put_result, get_result)
+
+async def run_phase(clients, op):
+    """Прогоняет op по всем блокам: каждый воркер берёт индексы из общей очереди и ходит через свой клиент"""
+    results = [None] * NUM_BLOCKS
+    indices = iter(range(NUM_BLOCKS))
+
+    async def worker(client):
+        for index in indices:
+            results[index] = await op(client, index)
+
+    await asyncio.gather(*(worker(client) for client in clients))
+    return results
+
+def create_clients():
+    """Клиенты для воркеров фазы: в режиме HTTP/2 все воркеры делят одно соединение"""
+    if HTTP2:
+        client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=1, max_connections=1),
+            http1=False,
+            http2=True
+        )
+        return [client] * NUM_BLOCKS, [client]
+
+    # Не больше одного соединения на воркера одновременно. Сервер отвечает с Connection: close,
+    # поэтому клиент открывает новое соединение на каждый запрос; keep-alive заработает, если сервер начнёт держать соединения
+    clients = [
+        httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=1, max_connections=1),
+            http2=False
+        )
+        for _ in range(NUM_WORKERS)
+    ]
+    return clients, clients
+
+async def run_benchmark():
+    clients, owned_clients = create_clients()
 
-        put_success = sum(1 for _, success, _ in results if success)
-        put_failed = sum(1 for _, success, _ in results if not success)
-
-        for index, success, error in results:
-            if not success:
-                print(f"  Block {index}: PUT failed: {error}")
-
-        put_duration = put_end - put_start
-        put_rate = put_success / put_duration if put_duration > 0 else 0
-        put_throughput_mb = (put_success * BLOCK_SIZE) / (1024 * 1024) / put_duration if put_duration > 0 else 0
-
-        print(f"PUT: {put_success}/{NUM_BLOCKS} success, {put_failed} failed | {put_rate:.2f} blocks/sec ({put_throughput_mb:.2f} MB/s) | {put_duration:.2f}s")
+    try:
+        # === ТЕСТ PUT + GET (GET блока сразу после его PUT) ===
+        put_start = time.perf_counter_ns()
+        results = await run_phase(clients, put_get_block)
+        put_get_end = time.perf_counter_ns()
 
-        # === ТЕСТ GET ===
-        get_start = time.time()
-        results = list(executor.map(get_block, range(NUM_BLOCKS)))
-        get_end = time.time()
+        put_results = [put_result for put_result, _ in results]
+        get_results = [get_result for _, get_result in results if get_result is not None]
 
-        get_success = sum(1 for _, success, _ in results if success)
-        get_failed = sum(1 for _, success, _ in results if not success)
+        put_success = sum(1 for _, success, _, _ in put_results if success)
+        put_failed = sum(1 for _, success, _, _ in put_results if not success)
+        get_success = sum(1 for _, success, _, _ in get_results if success)
+        get_failed = sum(1 for _, success, _, _ in get_results if not success)
 
-        for index, success, error in results:
+        for index, success, error, _ in put_results:
+            if not success:
+                print(f"  Block {index}: PUT failed: {error}")
+        for index, success, error, _ in get_results:
             if not success:
                 print(f"  Block {index}: GET failed: {error}")
 
-        get_duration = get_end - get_start
-        get_rate = get_success / get_duration if get_duration > 0 else 0
-        get_throughput_mb = (get_success * BLOCK_SIZE) / (1024 * 1024) / get_duration if get_duration > 0 else 0
+        put_get_duration = (put_get_end - put_start) / 1e9
+        put_get_rate = (put_success + get_success) / put_get_duration if put_get_duration > 0 else 0
+        put_get_throughput_mb = ((put_success + get_success) * BLOCK_SIZE) / (1024 * 1024) / put_get_duration if put_get_duration > 0 else 0
 
-        print(f"GET: {get_success}/{NUM_BLOCKS} success, {get_failed} failed | {get_rate:.2f} blocks/sec ({get_throughput_mb:.2f} MB/s) | {get_duration:.2f}s")
+        print(f"PUT: {put_success}/{NUM_BLOCKS} success, {put_failed} failed | {latency_summary(put_results)}")
+        print(f"GET: {get_success}/{len(get_results)} success, {get_failed} failed | {latency_summary(get_results)}")
+        print(f"PUT+GET (overlapped): {put_get_rate:.2f} requests/sec ({put_get_throughput_mb:.2f} MB/s) | {put_get_duration:.2f}s")
 
         # === ТЕСТ DELETE ===
-        delete_start = time.time()
-        results = list(executor.map(delete_block, range(NUM_BLOCKS)))
-        delete_end = time.time()
+        delete_start = time.perf_counter_ns()
+        results = await run_phase(clients, delete_block)
+        delete_end = time.perf_counter_ns()
 
-        delete_success = sum(1 for _, success, _ in results if success)
-        delete_failed = sum(1 for _, success, _ in results if not success)
+        delete_success = sum(1 for _, success, _, _ in results if success)
+        delete_failed = sum(1 for _, success, _, _ in results if not success)
 
-        for index, success, error in results:
+        for index, success, error, _ in results:
             if not success:
                 print(f"  Block {index}: DELETE failed: {error}")
 
-        delete_duration = delete_end - delete_start
+        delete_duration = (delete_end - delete_start) / 1e9
         delete_rate = delete_success / delete_duration if delete_duration > 0 else 0
 
-        print(f"DELETE: {delete_success}/{NUM_BLOCKS} success, {delete_failed} failed | {delete_rate:.2f} blocks/sec | {delete_duration:.2f}s")
+        print(f"DELETE: {delete_success}/{NUM_BLOCKS} success, {delete_failed} failed | {delete_rate:.2f} blocks/sec | {delete_duration:.2f}s | {latency_summary(results)}")
 
         print()
-        total_duration = delete_end - put_start
+        total_duration = (delete_end - put_start) / 1e9
         print(f"Total time: {total_duration:.2f}s")
 
-finally:
-    client.close()
+    finally:
+        await asyncio.gather(*(client.aclose() for client in owned_clients))
+
+asyncio.run(run_benchmark())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+import socket
+import sys
+import time
+
+from benchmark_util import generate_blocks
+
+SERVER_HOST = "localhost"
+SERVER_PORT = 10001
+BLOCK_SIZE = 4096
+NUM_BLOCKS = 1000
+BATCH = 32  # Запросов в полёте: в одном соединении (pipelining) или по соединению на запрос
+
+# Заголовок PUT одинаков для всех блоков: Content-Length фиксирован
+PUT_HEADER = (
+    f"PUT / HTTP/1.1\r\n"
+    f"Host: {SERVER_HOST}\r\n"
+    f"Content-Length: {BLOCK_SIZE}\r\n"
+    f"Connection: keep-alive\r\n\r\n"
+).encode('ascii')
+
+print(f"=== FastBlock Raw Socket Benchmark: {NUM_BLOCKS} blocks x {BLOCK_SIZE} bytes, batch {BATCH} ===")
+
+blocks, hashes = generate_blocks(NUM_BLOCKS, BLOCK_SIZE)
+hashes_bytes = [expected_hash.encode('ascii') for expected_hash in hashes]
+
+def connect():
+    sock = socket.create_connection((SERVER_HOST, SERVER_PORT))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+    return sock
+
+def request_without_body(method, hash_value):
+    return f"{method} /{hash_value} HTTP/1.1\r\nHost: {SERVER_HOST}\r\nConnection: keep-alive\r\n\r\n".encode('ascii')
+
+def send_buffers(sock, buffers):
+    """Векторная отправка (sendmsg): заголовки и тела блоков уходят без склейки в один буфер"""
+    buffers = [memoryview(buffer) for buffer in buffers]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        # sendmsg может отправить часть данных: пропускаем ушедшие буферы, остаток досылаем
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers[0])
+            buffers.pop(0)
+        if buffers and sent:
+            buffers[0] = buffers[0][sent:]
+
+class ResponseReader:
+    """Читает подряд идущие HTTP/1.1 ответы из сокета: заголовки до \\r\\n\\r\\n, тело по Content-Length"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray()
+
+    def _fill(self):
+        chunk = self.sock.recv(256 * 1024)
+        if not chunk:
+            raise ConnectionError("connection closed by server")
+        self.buffer += chunk
+
+    def read_response(self):
+        """Возвращает (status, body, keep_alive)"""
+        while (header_end := self.buffer.find(b"\r\n\r\n")) < 0:
+            self._fill()
+
+        head = bytes(self.buffer[:header_end]).lower()
+        status = int(head[9:12])
+        content_length = 0
+        keep_alive = True
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name == b"content-length":
+                content_length = int(value)
+            elif name == b"connection":
+                keep_alive = value.strip() != b"close"
+
+        total = header_end + 4 + content_length
+        while len(self.buffer) < total:
+            self._fill()
+        body = bytes(self.buffer[header_end + 4:total])
+        del self.buffer[:total]
+        return status, body, keep_alive
+
+def server_keeps_alive():
+    """Пробный запрос: pipelining возможен, только если сервер не закрывает соединение после ответа"""
+    sock = connect()
+    try:
+        send_buffers(sock, [request_without_body("GET", "0" * 64)])
+        _, _, keep_alive = ResponseReader(sock).read_response()
+        return keep_alive
+    finally:
+        sock.close()
+
+def run_phase(requests, pipeline):
+    """Отправляет запросы пачками по BATCH и возвращает (status, body) в порядке запросов.
+
+    Каждый запрос - кортеж буферов (заголовок, тело).
+    pipeline=True: вся пачка одним sendmsg в одно keep-alive соединение, затем чтение BATCH ответов.
+    pipeline=False: по соединению на запрос, все запросы пачки отправляются до чтения первого ответа.
+    Сетевая ошибка не прерывает фазу: запрос получает (None, исключение) и считается неудачным.
+    """
+    responses = []
+    if pipeline:
+        sock = None
+        try:
+            for start in range(0, len(requests), BATCH):
+                batch = requests[start:start + BATCH]
+                try:
+                    if sock is None:
+                        sock = connect()
+                        reader = ResponseReader(sock)
+                    send_buffers(sock, [buffer for request in batch for buffer in request])
+                    for _ in batch:
+                        status, body, _ = reader.read_response()
+                        responses.append((status, body))
+                except OSError as e:
+                    # Соединение потеряно: оставшиеся ответы пачки - ошибки, следующая пачка - в новом соединении
+                    responses += [(None, e)] * (start + len(batch) - len(responses))
+                    if sock is not None:
+                        sock.close()
+                    sock = None
+        finally:
+            if sock is not None:
+                sock.close()
+        return responses
+
+    for start in range(0, len(requests), BATCH):
+        batch = requests[start:start + BATCH]
+        socks = [None] * len(batch)
+        batch_responses = [None] * len(batch)
+        try:
+            for k, request in enumerate(batch):
+                try:
+                    socks[k] = connect()
+                    send_buffers(socks[k], request)
+                except OSError as e:
+                    batch_responses[k] = (None, e)
+            for k, sock in enumerate(socks):
+                if batch_responses[k] is not None:
+                    continue
+                try:
+                    status, body, _ = ResponseReader(sock).read_response()
+                    batch_responses[k] = (status, body)
+                except OSError as e:
+                    batch_responses[k] = (None, e)
+        finally:
+            for sock in socks:
+                if sock is not None:
+                    sock.close()
+        responses += batch_responses
+    return responses
+
+def report_errors(responses):
+    """Сетевые ошибки печатаются после замера фазы"""
+    for i, (status, error) in enumerate(responses):
+        if status is None:
+            print(f"  Block {i}: {error}")
+
+def report(name, success, duration_ns, with_throughput):
+    duration = duration_ns / 1e9
+    rate = success / duration if duration > 0 else 0
+    line = f"{name}: {success}/{NUM_BLOCKS} success, {NUM_BLOCKS - success} failed | {rate:.2f} blocks/sec"
+    if with_throughput:
+        throughput_mb = (success * BLOCK_SIZE) / (1024 * 1024) / duration if duration > 0 else 0
+        line += f" ({throughput_mb:.2f} MB/s)"
+    print(f"{line} | {duration:.2f}s")
+
+try:
+    pipeline = server_keeps_alive()
+except OSError as e:
+    print(f"Server {SERVER_HOST}:{SERVER_PORT} unavailable: {e}")
+    sys.exit(1)
+print("Mode: HTTP/1.1 pipelining, 1 connection" if pipeline else "Mode: server closes connections, 1 connection per request")
+
+# Запросы собираются до замеров; тело PUT - срез общего буфера блоков, общий заголовок не копируется
+put_requests = [(PUT_HEADER, block) for block in blocks]
+get_requests = [(request_without_body("GET", expected_hash),) for expected_hash in hashes]
+delete_requests = [(request_without_body("DELETE", expected_hash),) for expected_hash in hashes]
+
+# === ТЕСТ PUT ===
+put_start = time.perf_counter_ns()
+responses = run_phase(put_requests, pipeline)
+put_end = time.perf_counter_ns()
+report_errors(responses)
+put_success = sum(1 for i, (status, body) in enumerate(responses) if status == 200 and body.rstrip() == hashes_bytes[i])
+report("PUT", put_success, put_end - put_start, True)
+
+# === ТЕСТ GET ===
+get_start = time.perf_counter_ns()
+responses = run_phase(get_requests, pipeline)
+get_end = time.perf_counter_ns()
+report_errors(responses)
+get_success = sum(1 for i, (status, body) in enumerate(responses) if status == 200 and body == blocks[i])
+report("GET", get_success, get_end - get_start, True)
+
+# === ТЕСТ DELETE ===
+delete_start = time.perf_counter_ns()
+responses = run_phase(delete_requests, pipeline)
+delete_end = time.perf_counter_ns()
+report_errors(responses)
+delete_success = sum(1 for status, _ in responses if status == 200)
+report("DELETE", delete_success, delete_end - delete_start, False)
+
+print()
+print(f"Total time: {(delete_end - put_start) / 1e9:.2f}s")
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
-import requests
-import hashlib
 import time
-import struct
+
+from benchmark_util import generate_blocks
+from http_session import TimeoutSession
 
 SERVER_URL = "http://localhost:10001"
 BLOCK_SIZE = 4096
@@ -10,80 +10,74 @@ NUM_BLOCKS = 1000
 
 print(f"=== FastBlock Benchmark: {NUM_BLOCKS} blocks x {BLOCK_SIZE} bytes ===")
 
-# Генерируем уникальные блоки
-blocks = []
-hashes = []
+# Уникальные блоки - срезы одного буфера; requests/urllib3 отправляют memoryview как есть, без копий
+blocks, hashes = generate_blocks(NUM_BLOCKS, BLOCK_SIZE)
+# Ответ PUT сравниваем как bytes, без декодирования тела в str
+hashes_bytes = [expected_hash.encode('ascii') for expected_hash in hashes]
 
-for i in range(NUM_BLOCKS):
-    # Создаем блок с уникальными первыми 8 байтами (номер блока)
-    block = struct.pack('<Q', i) + b'A' * (BLOCK_SIZE - 8)
-    expected_hash = hashlib.sha256(block).hexdigest()
-    blocks.append(block)
-    hashes.append(expected_hash)
+def report_errors(errors):
+    """Ошибки копятся во время замера и печатаются только после него"""
+    for index, what, detail in errors:
+        print(f"  Block {index}: {what} {detail}")
 
 # Используем requests с session для keep-alive
-session = requests.Session()
+session = TimeoutSession(timeout=5)
 
 try:
     # === ТЕСТ PUT + GET (записать блок N, потом N+1, потом прочитать N) ===
-    put_start = time.time()
+    put_start = time.perf_counter_ns()
     put_success = 0
     put_failed = 0
     get_success = 0
     get_failed = 0
+    errors = []
 
     for i, block in enumerate(blocks):
         # PUT текущего блока
         try:
-            response = session.put(f"{SERVER_URL}/", data=block, timeout=5)
+            response = session.put(f"{SERVER_URL}/", data=block)
             if response.status_code == 200:
-                returned_hash = response.text.strip()
-                if returned_hash == hashes[i]:
+                returned_hash = response.content.rstrip()
+                if returned_hash == hashes_bytes[i]:
                     put_success += 1
                 else:
                     put_failed += 1
-                    print(f"  Block {i}: Hash mismatch on PUT!")
-                    print(f"    Expected: {hashes[i]}")
-                    print(f"    Got:      {returned_hash}")
+                    errors.append((i, "Hash mismatch on PUT, got", returned_hash.decode('ascii', 'replace')))
                     break
             else:
                 put_failed += 1
-                print(f"  Block {i}: PUT failed with status {response.status_code}")
+                errors.append((i, "PUT failed with status", response.status_code))
                 break
         except Exception as e:
             put_failed += 1
-            print(f"  Block {i}: PUT Exception: {e}")
+            errors.append((i, "PUT Exception:", e))
             break
 
         # GET предыдущего блока (если есть)
         if i > 0:
             prev_idx = i - 1
             try:
-                response = session.get(f"{SERVER_URL}/{hashes[prev_idx]}", timeout=5)
+                response = session.get(f"{SERVER_URL}/{hashes[prev_idx]}")
                 if response.status_code == 200:
                     retrieved_data = response.content
                     if len(retrieved_data) == BLOCK_SIZE and retrieved_data == blocks[prev_idx]:
                         get_success += 1
                     else:
                         get_failed += 1
-                        print(f"  Block {prev_idx}: GET data mismatch after writing block {i}!")
-                        print(f"    Expected hash: {hashes[prev_idx]}")
-                        print(f"    Expected size: {BLOCK_SIZE}, got: {len(retrieved_data)}")
-                        if len(retrieved_data) == BLOCK_SIZE:
-                            actual_hash = hashlib.sha256(retrieved_data).hexdigest()
-                            print(f"    Actual hash:   {actual_hash}")
+                        errors.append((prev_idx, "GET data mismatch, size", len(retrieved_data)))
                         break
                 else:
                     get_failed += 1
-                    print(f"  Block {prev_idx}: GET failed with status {response.status_code}")
+                    errors.append((prev_idx, "GET failed with status", response.status_code))
                     break
             except Exception as e:
                 get_failed += 1
-                print(f"  Block {prev_idx}: GET Exception: {e}")
+                errors.append((prev_idx, "GET Exception:", e))
                 break
 
-    put_end = time.time()
-    put_duration = put_end - put_start
+    put_end = time.perf_counter_ns()
+    report_errors(errors)
+    put_duration = (put_end - put_start) / 1e9
     put_rate = put_success / put_duration if put_duration > 0 else 0
     put_throughput_mb = (put_success * BLOCK_SIZE) / (1024 * 1024) / put_duration if put_duration > 0 else 0
 
@@ -91,59 +85,63 @@ try:
     print(f"GET (interleaved): {get_success}/{NUM_BLOCKS-1} success, {get_failed} failed")
 
     # === ТЕСТ GET (все блоки) ===
-    get_start = time.time()
+    get_start = time.perf_counter_ns()
     get_success = 0
     get_failed = 0
+    errors = []
 
     for i, expected_hash in enumerate(hashes):
         try:
-            response = session.get(f"{SERVER_URL}/{expected_hash}", timeout=5)
+            response = session.get(f"{SERVER_URL}/{expected_hash}")
             if response.status_code == 200:
                 retrieved_data = response.content
                 if len(retrieved_data) == BLOCK_SIZE and retrieved_data == blocks[i]:
                     get_success += 1
                 else:
                     get_failed += 1
-                    print(f"  Block {i}: Data mismatch!")
+                    errors.append((i, "Data mismatch, size", len(retrieved_data)))
             else:
                 get_failed += 1
-                print(f"  Block {i}: GET failed with status {response.status_code}")
+                errors.append((i, "GET failed with status", response.status_code))
         except Exception as e:
             get_failed += 1
-            print(f"  Block {i}: Exception: {e}")
+            errors.append((i, "Exception:", e))
 
-    get_end = time.time()
-    get_duration = get_end - get_start
+    get_end = time.perf_counter_ns()
+    report_errors(errors)
+    get_duration = (get_end - get_start) / 1e9
     get_rate = get_success / get_duration if get_duration > 0 else 0
     get_throughput_mb = (get_success * BLOCK_SIZE) / (1024 * 1024) / get_duration if get_duration > 0 else 0
 
     print(f"GET: {get_success}/{NUM_BLOCKS} success, {get_failed} failed | {get_rate:.2f} blocks/sec ({get_throughput_mb:.2f} MB/s) | {get_duration:.2f}s")
 
     # === ТЕСТ DELETE ===
-    delete_start = time.time()
+    delete_start = time.perf_counter_ns()
     delete_success = 0
     delete_failed = 0
+    errors = []
 
     for i, expected_hash in enumerate(hashes):
         try:
-            response = session.delete(f"{SERVER_URL}/{expected_hash}", timeout=5)
+            response = session.delete(f"{SERVER_URL}/{expected_hash}")
             if response.status_code == 200:
                 delete_success += 1
             else:
                 delete_failed += 1
-                print(f"  Block {i}: DELETE failed with status {response.status_code}")
+                errors.append((i, "DELETE failed with status", response.status_code))
         except Exception as e:
             delete_failed += 1
-            print(f"  Block {i}: Exception: {e}")
+            errors.append((i, "Exception:", e))
 
-    delete_end = time.time()
-    delete_duration = delete_end - delete_start
+    delete_end = time.perf_counter_ns()
+    report_errors(errors)
+    delete_duration = (delete_end - delete_start) / 1e9
     delete_rate = delete_success / delete_duration if delete_duration > 0 else 0
 
     print(f"DELETE: {delete_success}/{NUM_BLOCKS} success, {delete_failed} failed | {delete_rate:.2f} blocks/sec | {delete_duration:.2f}s")
 
     print()
-    total_duration = delete_end - put_start
+    total_duration = (delete_end - put_start) / 1e9
     print(f"Total time: {total_duration:.2f}s")
 
 finally:
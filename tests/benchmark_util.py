@@ -0,0 +1,29 @@
+"""Общая подготовка данных для бенчмарков FastBlock"""
+import hashlib
+import struct
+
+
+def generate_blocks(num_blocks, block_size):
+    """Уникальные блоки и их SHA-256.
+
+    Все блоки лежат в одном буфере и отличаются только последними 8 байтами
+    (номер блока), остальное заполнено b'A'. Возвращает срезы буфера
+    (memoryview, без копий) и hex-хеши в том же порядке.
+    """
+    buffer = bytearray(b'A') * (num_blocks * block_size)
+    for i in range(num_blocks):
+        struct.pack_into('<Q', buffer, (i + 1) * block_size - 8, i)
+    view = memoryview(buffer)
+    blocks = [view[i * block_size:(i + 1) * block_size] for i in range(num_blocks)]
+
+    # Общий префикс хешируем один раз, для каждого блока копируем состояние
+    # SHA-256 и дописываем только его последние 8 байт
+    prefix_state = hashlib.sha256(b'A' * (block_size - 8))
+    hashes = []
+    for block in blocks:
+        state = prefix_state.copy()
+        state.update(block[-8:])
+        hashes.append(state.hexdigest())
+
+    return blocks, hashes
+
@@ -0,0 +1,14 @@
+"""requests-сессия для тестов FastBlock"""
+import requests
+
+
+class TimeoutSession(requests.Session):
+    """Keep-alive сессия с таймаутом по умолчанию: он подставляется в запросы, где таймаут не задан явно"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
@@ -1,93 +1,273 @@
 #!/usr/bin/env python3
-import requests
+import aiohttp
+import asyncio
+import multiprocessing
+import os
+import queue
 import time
 import hashlib
+import statistics
+from concurrent.futures import ThreadPoolExecutor
 
 SERVER_URL = "http://localhost:10001"
+BLOCK_URL = f"{SERVER_URL}/block/"  # Префикс URL блоков: PUT на него, GET/DELETE - с хешем в конце
 BLOCK_SIZE = 4 * 1024*4*4*4*4
 NUM_BLOCKS = 1000
+CONCURRENCY = 64  # Блоков в обработке одновременно (всего, на все процессы)
+# Процессов-клиентов: один процесс упирается в одно ядро. Берутся только разрешённые ядра,
+# чтобы клиента можно было отделить от сервера: taskset -c 4-7 ./load_test_concurrent.py
+NUM_PROCS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+VERIFY = True  # Сверять хеш от сервера с локальным SHA-256
+VERIFY_EVERY = 64  # Хеш считается для каждого N-го блока
+# Полный GET со сверкой данных - для каждого N-го блока. Остальные блоки не читаются:
+# HEAD тут не помогает - сервер отвечает на него 200 и кладёт "true"/"false" в тело, которое клиенты отбрасывают
+FULL_VERIFY_EVERY = 100
 
-def run_load_test():
-    print(f"Запуск нагрузочного теста с {NUM_BLOCKS} блоками по {BLOCK_SIZE} байт...")
+def sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
 
-    write_times = []
-    read_times = []
-    hashes = []
+def percentiles(times):
+    """p50/p95/p99 по списку времён в наносекундах, вывод в секундах"""
+    # inclusive: на малых выборках (выборочные GET) процентили не выходят за измеренный максимум
+    cuts = statistics.quantiles(times, n=100, method="inclusive")
+    return f"p50 {cuts[49] / 1e9:.6f}, p95 {cuts[94] / 1e9:.6f}, p99 {cuts[98] / 1e9:.6f} сек"
 
-    for i in range(NUM_BLOCKS):
-        # Создаем уникальный блок данных
-        data = bytearray(b"A" * BLOCK_SIZE)
-        data[:4] = i.to_bytes(4, 'big')  # Меняем первые 4 байта
+async def run_shard(shard, concurrency, pool):
+    """PUT (+ выборочный GET) блоков shard (range индексов) в своём цикле событий и своём пуле соединений.
 
-        # --- Запись (PUT) ---
-        start_time = time.monotonic()
-        try:
-            response = requests.put(f"{SERVER_URL}/block/", data=bytes(data))
-            response.raise_for_status()  # Проверка на ошибки HTTP
-            write_time = time.monotonic() - start_time
-            write_times.append(write_time)
-            hash_value = response.text.strip()
-            hashes.append(hash_value)
-
-            # Проверка хеша для уверенности
-            expected_hash = hashlib.sha256(data).hexdigest()
-            if hash_value != expected_hash:
+    Блок i - срез pool[i:i + BLOCK_SIZE].
+
+    Возвращает (write_times, read_times, hashes, start_ns, end_ns); списки выровнены по shard.
+    """
+    loop = asyncio.get_running_loop()
+
+    # Времена (в наносекундах) и хеши по индексу блока: None - операция для блока не выполнилась
+    write_times = [None] * len(shard)
+    read_times = [None] * len(shard)
+    hashes = [None] * len(shard)
+
+    pool = memoryview(pool)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # SHA-256 считается в потоках параллельно с PUT: hashlib отпускает GIL на время хеширования.
+    # Пул создаётся уже в дочернем процессе - потоки не переживают fork
+    hash_executor = ThreadPoolExecutor(max_workers=2)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def process_block(i):
+            data = pool[i:i + BLOCK_SIZE]
+            slot = i - shard.start
+
+            # Проверка хеша для уверенности (выборочно): хеш считается в потоке, пока идёт PUT
+            hash_future = None
+            if VERIFY and i % VERIFY_EVERY == 0:
+                hash_future = loop.run_in_executor(hash_executor, sha256_hex, data)
+
+            # --- Запись (PUT) ---
+            start_time = time.perf_counter_ns()
+            try:
+                # memoryview уходит в aiohttp как есть, без копии в bytes
+                async with session.put(BLOCK_URL, data=data) as response:
+                    body = await response.read()
+                if response.status != 200:
+                    print(f"Ошибка при записи блока {i}: статус {response.status}")
+                    return
+                # Тело - 64 hex-символа SHA-256: без text() и определения кодировки
+                hash_value = body[:64].decode("ascii")
+                write_times[slot] = time.perf_counter_ns() - start_time
+                hashes[slot] = hash_value
+
+            except aiohttp.ClientError as e:
+                print(f"Ошибка при записи блока {i}: {e}")
+                return
+
+            finally:
+                # Хеш дожидаемся и при ошибке PUT: задачи в пуле потоков не остаются без владельца
+                expected_hash = await hash_future if hash_future is not None else None
+
+            if expected_hash is not None and hash_value != expected_hash:
                 print(f"Ошибка: Хеш не совпадает для блока {i}!")
-                continue
+                return
 
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка при записи блока {i}: {e}")
-            continue
+            if i % FULL_VERIFY_EVERY != 0:
+                return
+
+            # --- Чтение (GET) ---
+            start_time = time.perf_counter_ns()
+            try:
+                async with session.get(BLOCK_URL + hash_value) as response:
+                    content = await response.read()
+                if response.status != 200:
+                    print(f"Ошибка при чтении блока {i}: статус {response.status}")
+                    return
+                read_times[slot] = time.perf_counter_ns() - start_time
+
+                if content != data:
+                    print(f"Ошибка: Данные не совпадают для блока {i}!")
+
+            except aiohttp.ClientError as e:
+                print(f"Ошибка при чтении блока {i}: {e}")
+                return
+
+        async def worker(i):
+            async with semaphore:
+                await process_block(i)
 
-        # --- Чтение (GET) ---
-        start_time = time.monotonic()
         try:
-            response = requests.get(f"{SERVER_URL}/block/{hash_value}")
-            response.raise_for_status()
-            read_time = time.monotonic() - start_time
-            read_times.append(read_time)
+            start_ns = time.perf_counter_ns()
+            await asyncio.gather(*(worker(i) for i in shard))
+            end_ns = time.perf_counter_ns()
+        finally:
+            hash_executor.shutdown()
 
-            if response.content != data:
-                print(f"Ошибка: Данные не совпадают для блока {i}!")
+    return write_times, read_times, hashes, start_ns, end_ns
 
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка при чтении блока {i}: {e}")
+def shard_worker(shard, concurrency, pool, out_queue):
+    """Тело дочернего процесса: результат (или None при сбое) всегда уходит в очередь"""
+    result = None
+    try:
+        result = asyncio.run(run_shard(shard, concurrency, pool))
+    finally:
+        out_queue.put((shard.start, result))
+
+async def delete_blocks(hashes):
+    """Параллельное удаление созданных блоков, не больше CONCURRENCY запросов одновременно.
+
+    Возвращает число успешно удалённых блоков.
+    """
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=CONCURRENCY, limit_per_host=CONCURRENCY, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def delete(i, hash_val):
+            async with semaphore:
+                try:
+                    async with session.delete(BLOCK_URL + hash_val) as response:
+                        await response.read()
+                        if response.status == 200:
+                            return True
+                        print(f"Ошибка при удалении блока {i} с хешем {hash_val}: статус {response.status}")
+                except aiohttp.ClientError as e:
+                    print(f"Ошибка при удалении блока {i} с хешем {hash_val}: {e}")
+                return False
+
+        results = await asyncio.gather(*(
+            delete(i, hash_val) for i, hash_val in enumerate(hashes) if hash_val is not None
+        ))
+        return sum(results)
+
+def collect_results(shards, procs, out_queue):
+    """Результаты процессов по shard.start. Процесс, убитый до отправки результата
+    (OOM, SIGKILL, segfault), в очередь ничего не положит: его результат - None."""
+    results = {}
+    while len(results) < len(procs):
+        try:
+            start, result = out_queue.get(timeout=1)
+            results[start] = result
             continue
-        
-        print(f"Блок {i+1}/{NUM_BLOCKS} обработан.", end='\r')
+        except queue.Empty:
+            pass
+        dead = [shard for shard, proc in zip(shards, procs) if shard.start not in results and not proc.is_alive()]
+        if not dead:
+            continue
+        # Результат завершившегося процесса уже в канале очереди: дочитываем его, прежде чем считать процесс упавшим
+        try:
+            while True:
+                start, result = out_queue.get(timeout=0.1)
+                results[start] = result
+        except queue.Empty:
+            pass
+        for shard in dead:
+            results.setdefault(shard.start, None)
+    return results
+
+def run_load_test():
+    # Не больше CONCURRENCY процессов: у каждого хотя бы один запрос в полёте, а всего - не больше CONCURRENCY
+    num_procs = max(1, min(NUM_PROCS, NUM_BLOCKS, CONCURRENCY))
+    concurrency = max(1, CONCURRENCY // num_procs)
+    print(f"Запуск нагрузочного теста с {NUM_BLOCKS} блоками по {BLOCK_SIZE} байт, "
+          f"{num_procs} процессов по {concurrency} параллельно...")
+
+    # Индексы блоков делятся на непрерывные равные куски, по куску на процесс
+    shards = [
+        range(k * NUM_BLOCKS // num_procs, (k + 1) * NUM_BLOCKS // num_procs)
+        for k in range(num_procs)
+    ]
 
-    print("\n\nТест завершен.")
+    # Все блоки - срезы одного случайного буфера со сдвигом на i байт: уникальны без аллокаций на блок.
+    # Буфер неизменяемый, после fork процессы читают его общие страницы без копирования
+    pool = os.urandom(BLOCK_SIZE + NUM_BLOCKS)
+
+    ctx = multiprocessing.get_context("fork")
+    out_queue = ctx.Queue()
+    procs = [ctx.Process(target=shard_worker, args=(shard, concurrency, pool, out_queue)) for shard in shards]
+    for proc in procs:
+        proc.start()
+
+    # Очередь вычитывается до join: иначе процесс с большим результатом не завершится
+    results = collect_results(shards, procs, out_queue)
+    for proc in procs:
+        proc.join()
+
+    print("\nТест завершен.")
+
+    # Результаты процессов склеиваются в порядке шардов: индекс в списках = индекс блока
+    write_times = []
+    read_times = []
+    hashes = []
+    starts = []
+    ends = []
+    for shard, proc in zip(shards, procs):
+        result = results[shard.start]
+        if result is None:
+            print(f"Ошибка: процесс блоков {shard.start}-{shard.stop - 1} завершился сбоем (код {proc.exitcode})")
+            write_times += [None] * len(shard)
+            read_times += [None] * len(shard)
+            hashes += [None] * len(shard)
+            continue
+        shard_writes, shard_reads, shard_hashes, start_ns, end_ns = result
+        write_times += shard_writes
+        read_times += shard_reads
+        hashes += shard_hashes
+        starts.append(start_ns)
+        ends.append(end_ns)
 
     # --- Удаление созданных блоков ---
+    stored = sum(1 for hash_val in hashes if hash_val is not None)
     print("Удаление тестовых данных...")
-    for i, hash_val in enumerate(hashes):
-        try:
-            requests.delete(f"{SERVER_URL}/block/{hash_val}")
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка при удалении блока {i} с хешем {hash_val}: {e}")
-    print("Удаление завершено.")
-
+    delete_start = time.perf_counter_ns()
+    deleted = asyncio.run(delete_blocks(hashes))
+    delete_duration = (time.perf_counter_ns() - delete_start) / 1e9
+    print(f"Удаление завершено: {deleted}/{stored} за {delete_duration:.2f} сек.")
 
     # --- Результаты ---
-    if not write_times or not read_times:
+    write_times = [t for t in write_times if t is not None]
+    read_times = [t for t in read_times if t is not None]
+    if len(write_times) < 2:
         print("Не удалось получить достаточно данных для анализа.")
         return
 
-    total_write_time = sum(write_times)
-    total_read_time = sum(read_times)
-    
-    avg_write_time = total_write_time / len(write_times)
-    avg_read_time = total_read_time / len(read_times)
+    # perf_counter_ns - общие для процессов монотонные часы: от первого старта до последнего финиша
+    test_duration = (max(ends) - min(starts)) / 1e9
 
-    writes_per_second = 1 / avg_write_time if avg_write_time > 0 else float('inf')
-    reads_per_second = 1 / avg_read_time if avg_read_time > 0 else float('inf')
+    # RPS - успешные PUT за всё время теста: при CONCURRENCY запросов в полёте 1 / среднее время - не темп.
+    # Для выборочных GET темп не считается: их ~NUM_BLOCKS / FULL_VERIFY_EVERY на всё время теста, важна только латентность
+    avg_write_time = statistics.fmean(write_times) / 1e9
+    writes_per_second = len(write_times) / test_duration
 
     print("\n--- Результаты нагрузочного теста ---")
-    print(f"Всего блоков обработано: {len(hashes)}")
+    print(f"Всего блоков обработано: {stored}")
     print(f"Среднее время записи: {avg_write_time:.6f} сек")
-    print(f"Среднее время чтения: {avg_read_time:.6f} сек")
+    print(f"Запись: {percentiles(write_times)}")
     print(f"Записей в секунду (RPS): {writes_per_second:.2f}")
-    print(f"Чтений в секунду (RPS): {reads_per_second:.2f}")
+    if len(read_times) >= 2:
+        avg_read_time = statistics.fmean(read_times) / 1e9
+        print(f"Среднее время чтения (каждый {FULL_VERIFY_EVERY}-й блок): {avg_read_time:.6f} сек")
+        print(f"Чтение: {percentiles(read_times)}")
+    total_per_second = (len(write_times) + len(read_times)) / test_duration
+    print(f"Запросов в секунду (PUT + выборочный GET, все соединения): {total_per_second:.2f}")
     print("------------------------------------")
 
 
@@ -1,18 +1,49 @@
 #!/usr/bin/env python3
 import requests
+from requests.adapters import HTTPAdapter
 
 import hashlib
 
+from http_session import TimeoutSession
+
 SERVER_URL = "http://localhost:10001"
 
-def push_block(data: bytes) -> str:
-    """Вспомогательная функция, которая выполняет PUT и проверяет хеш."""
-    print(f"Отправка {len(data)} байт...")
-    response = requests.put(f"{SERVER_URL}/", data=data, timeout=5)
-    response.raise_for_status()
-    hash_value = response.text.strip()
+# Одна keep-alive сессия на все PUT/GET/DELETE теста
+session = TimeoutSession(timeout=5)
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=64, max_retries=0))
+
+# Дайджесты блоков из повторяющегося байта: (pattern, length) -> sha256 hex
+_digest_cache: dict[tuple[bytes, int], str] = {}
 
-    expected_hash = hashlib.sha256(data).hexdigest()
+def pattern_digests(block: memoryview, tail: int = 256) -> tuple[str, str]:
+    """SHA-256 блоков block[:-tail] и block целиком за один проход:
+    состояние хеша после короткого блока копируется и дописывается хвостом.
+    block - блок из одного повторяющегося байта."""
+    pattern, length = bytes(block[:1]), len(block)
+    short_key, full_key = (pattern, length - tail), (pattern, length)
+    if short_key not in _digest_cache or full_key not in _digest_cache:
+        hasher = hashlib.sha256(block[:length - tail])
+        _digest_cache[short_key] = hasher.hexdigest()
+        hasher.update(block[length - tail:])
+        _digest_cache[full_key] = hasher.hexdigest()
+    return _digest_cache[short_key], _digest_cache[full_key]
+
+
+def push_block(data: bytes | memoryview, expected_hash: str | None = None) -> str:
+    """Вспомогательная функция, которая выполняет PUT и проверяет хеш.
+
+    expected_hash можно передать заранее посчитанным, иначе он считается по data.
+    """
+    print(f"Отправка {len(data)} байт...")
+    # data - bytes или memoryview поверх bytes: urllib3 шлёт его как есть, копия не нужна
+    response = session.put(f"{SERVER_URL}/", data=data)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"PUT вернул статус {response.status_code}", response=response)
+    # Тело - 64 hex-символа SHA-256: без response.text и определения кодировки
+    hash_value = response.content[:64].decode("ascii")
+
+    if expected_hash is None:
+        expected_hash = hashlib.sha256(data).hexdigest()
     if hash_value != expected_hash:
         raise AssertionError(
             f"Хеш от сервера {hash_value} не совпадает с ожидаемым {expected_hash}"
@@ -21,8 +52,8 @@ def push_block(data: bytes) -> str:
     return hash_value
 
 
-def fetch_block(hash_value: str, expected_data: bytes) -> None:
-    response = requests.get(f"{SERVER_URL}/{hash_value}", timeout=5)
+def fetch_block(hash_value: str, expected_data: bytes | memoryview) -> None:
+    response = session.get(f"{SERVER_URL}/{hash_value}")
     response.raise_for_status()
     retrieved_data = response.content
     if retrieved_data != expected_data:
@@ -33,11 +64,11 @@ def fetch_block(hash_value: str, expected_data: bytes) -> None:
 
 
 def delete_block(hash_value: str) -> None:
-    response = requests.delete(f"{SERVER_URL}/{hash_value}", timeout=5)
+    response = session.delete(f"{SERVER_URL}/{hash_value}")
     response.raise_for_status()
     print("DELETE ok")
 
-    response = requests.get(f"{SERVER_URL}/{hash_value}", timeout=5)
+    response = session.get(f"{SERVER_URL}/{hash_value}")
     if response.status_code != 404:
         raise AssertionError("Блок после удаления должен отдавать 404")
     print("Проверка удаления OK (404)")
@@ -53,20 +84,26 @@ def basic_put_get_delete():
 def sequential_block_sizes():
     sizes_kb = [ 256, 128, 64, 32, 16, 8, 4] #512,
     hashes = []
+    # Один буфер на блок: второй проход отправляет его же без последних 256 байт
+    blocks = [
+        memoryview(bytes([(65 + idx) % 256]) * (size_kb * 1024))
+        for idx, size_kb in enumerate(sizes_kb)
+    ]
 
     for idx, size_kb in enumerate(sizes_kb):
-        pattern = bytes([(65 + idx) % 256])
-        data = pattern * (size_kb * 1024)
+        data = blocks[idx]
+        _, expected_hash = pattern_digests(data)
         print(f"\n=== Блок #{idx + 1}: {size_kb} KB ===")
-        block_hash = push_block(data)
+        block_hash = push_block(data, expected_hash)
         fetch_block(block_hash, data)
         hashes.append((block_hash, size_kb))
 
     for idx, size_kb in enumerate(sizes_kb): 
-        pattern = bytes([(65 + idx) % 256])
-        data = pattern * ((size_kb * 1024) -256)
+        data = blocks[idx][:-256]
+        # Хеш уже посчитан в первом проходе вместе с полным блоком
+        expected_hash, _ = pattern_digests(blocks[idx])
         print(f"\n=== Блок #{idx + 1}: {size_kb}  -256 KB ===")
-        block_hash = push_block(data)
+        block_hash = push_block(data, expected_hash)
         fetch_block(block_hash, data)
         hashes.append((block_hash, size_kb))    
 
@@ -77,5 +114,8 @@ def sequential_block_sizes():
 
 
 if __name__ == "__main__":
-    basic_put_get_delete()
-    sequential_block_sizes()
+    try:
+        basic_put_get_delete()
+        sequential_block_sizes()
+    finally:
+        session.close()